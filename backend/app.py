@@ -1,7 +1,23 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import gc
+import math
+import os
+import threading
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict
+from fastapi.responses import JSONResponse
+from typing import Dict, Optional
+from backend.config import (
+    PRELOAD_MODELS, WARMUP_ON_STARTUP, MAX_UPLOAD_BYTES, MAX_AUDIO_SECONDS,
+    MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS, QUEUE_TIMEOUT_SECONDS,
+    RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST, ANSWER_CACHE_ENABLED,
+)
+from backend.core.answer_cache import AnswerCache
 from backend.core.answer_engine import AnswerEngine
+from backend.core.limits import AdmissionController, ClientRateLimiter, Overloaded
+from backend.core.router import POLICIES
+from backend.core.sessions import SessionStore
+from backend.voice.preprocess import AudioRejected, AudioTooLong, preprocess_audio, wav_duration
 from backend.voice.stt import speech_to_text
 from backend.voice.tts import text_to_speech
 from fastapi.staticfiles import StaticFiles
@@ -15,15 +31,98 @@ app = FastAPI(
     version="1.0.0"
 )
 
+
+engine = AnswerEngine(cache=AnswerCache() if ANSWER_CACHE_ENABLED else None)
+_warmup_error = None
+
+# Every /ask-voice fans out to several paid providers, so bound how many run
+# at once and shed load early (503) instead of letting providers 429 everyone.
+admission = AdmissionController(MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS, QUEUE_TIMEOUT_SECONDS)
+rate_limiter = ClientRateLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST)
+sessions = SessionStore()
+
+
+# Allowance for multipart boundaries and the small form fields next to the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+@app.middleware("http")
+async def shed_load(request: Request, call_next):
+    # Runs before the route parses the multipart body, so oversized uploads,
+    # clients over their rate and requests that could never get a slot are
+    # turned away without uploading (and spooling) the audio first. The endpoint still waits for
+    # a real admission slot once the body is in.
+    if request.method == "POST" and request.url.path == "/ask-voice":
+        # Bodies sent without a Content-Length (chunked) are still capped by
+        # read_upload, but only after FastAPI has spooled them
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD:
+            return JSONResponse(status_code=413, content={"detail": "Audio upload too large"})
+
+        client = request.client.host if request.client else "unknown"
+        wait = rate_limiter.check(client)
+        if wait > 0:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+        try:
+            admission.check()
+        except Overloaded as e:
+            return JSONResponse(
+                status_code=503,
+                content={"detail": str(e)},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+    return await call_next(request)
+
+
+# Added after shed_load so it wraps it: early 429/503 responses still carry
+# CORS headers, and the browser may read Retry-After.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
-engine = AnswerEngine()
+if PRELOAD_MODELS:
+    # Load once in the parent process; forked workers inherit the model and
+    # index copy-on-write. Freezing moves everything allocated so far out of
+    # the GC's reach, so collections in workers don't touch (and copy) them.
+    engine.warmup()
+    gc.freeze()
+
+
+def _warmup():
+    global _warmup_error
+    try:
+        engine.warmup()
+        _warmup_error = None
+        print(f"✅ Engine ready in {engine.load_seconds}s (pid {os.getpid()})")
+    except Exception as e:
+        _warmup_error = str(e)
+        print(f"❌ Engine warmup failed: {e}")
+
+
+@app.on_event("startup")
+def start_warmup():
+    if WARMUP_ON_STARTUP and not engine.ready:
+        threading.Thread(target=_warmup, name="engine-warmup", daemon=True).start()
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
 
 # -----------------------------
 # Health Check
@@ -31,16 +130,106 @@ engine = AnswerEngine()
 @app.get("/")
 def health():
     return {"status": "ok", "message": "VoiceIQ API running"}
+
+
+# -----------------------------
+# Readiness Check
+# -----------------------------
+@app.get("/ready")
+def ready():
+    body = {
+        "ready": engine.ready,
+        "pid": os.getpid(),
+        "load_seconds": engine.load_seconds,
+        "rss_mb": _rss_mb(),
+        "admission": admission.stats(),
+        "providers": engine.router.snapshot(),
+    }
+    if not engine.ready:
+        # A failed warmup may still be recovered by a later lazy load, so
+        # the error is only reported while the engine is not ready.
+        if _warmup_error:
+            body["error"] = _warmup_error
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+# -----------------------------
+# Bounded upload read
+# -----------------------------
+UPLOAD_READ_CHUNK = 64 * 1024
+
+
+async def read_upload(file: UploadFile):
+    """
+    Copy the spooled upload into memory in chunks, stopping as soon as it
+    exceeds MAX_UPLOAD_BYTES (or, for WAV, as soon as the header says it is
+    longer than MAX_AUDIO_SECONDS). By now FastAPI has already received the
+    body; shed_load is what rejects oversized requests before that.
+    """
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Audio upload too large")
+
+    buf = bytearray()
+    while True:
+        chunk = await file.read(UPLOAD_READ_CHUNK)
+        if not chunk:
+            break
+
+        if not buf:
+            duration = wav_duration(chunk[:64])
+            if duration is not None and duration > MAX_AUDIO_SECONDS:
+                raise HTTPException(status_code=413, detail="Recording too long")
+
+        buf.extend(chunk)
+        if len(buf) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Audio upload too large")
+
+    return bytes(buf)
+
 # -----------------------------
 # VOICE → TEXT → ANSWER → VOICE
 # -----------------------------
 @app.post("/ask-voice")
-async def ask_voice(file: UploadFile = File(...)):
+async def ask_voice(
+    file: UploadFile = File(...),
+    session_id: Optional[str] = Form(None),
+    policy: Optional[str] = Form(None)
+):
+    if policy is not None and policy not in POLICIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown routing policy; expected one of {', '.join(POLICIES)}"
+        )
+
+    # Per-client rate limit and the capacity pre-check ran in shed_load
     try:
-        audio_bytes = await file.read()
+        async with admission.slot():
+            return await _ask_voice(file, session_id, policy)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+async def _ask_voice(file: UploadFile, session_id: Optional[str] = None, policy: Optional[str] = None):
+    try:
+        audio_bytes = await read_upload(file)
+
+        # 1️⃣ Trim / downmix / re-encode, then Speech → Text
+        # (blocking work runs in the threadpool so the event loop keeps
+        # accepting, queueing and rejecting other requests)
+        try:
+            audio_bytes, content_type, audio_info = await run_in_threadpool(preprocess_audio, audio_bytes)
+        except AudioTooLong as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except AudioRejected as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        print(f"🎙️ Audio {audio_info['format']}: {audio_info['bytes_in']} → {audio_info['bytes_out']} bytes")
 
-        # 1️⃣ Speech → Text
-        stt_result = speech_to_text(audio_bytes)
+        stt_result = await run_in_threadpool(speech_to_text, audio_bytes, content_type=content_type)
 
         #  NORMALIZE STT OUTPUT
         if isinstance(stt_result, dict):
@@ -54,7 +243,10 @@ async def ask_voice(file: UploadFile = File(...)):
             raise HTTPException(status_code=400, detail="Could not transcribe audio")
 
         # 2️⃣ Get AI answers (TEXT + AUDIO)
-        engine_results = engine.answer(transcript)
+        # Unknown or expired IDs start a new conversation
+        session = sessions.get_or_create(session_id)
+        run = await run_in_threadpool(engine.run, transcript, session=session, policy=policy)
+        engine_results = run["answers"]
 
         # 3️⃣ Extract text and convert audio files to hex
         answers_text = {}
@@ -87,11 +279,15 @@ async def ask_voice(file: UploadFile = File(...)):
                 answers_audio[model] = None
 
         return {
+            "session_id": session.session_id,
             "question_voice_text": transcript,
             "answers_text": answers_text,
-            "answers_audio": answers_audio
+            "answers_audio": answers_audio,
+            "routing": run["routing"]
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,95 @@
+import argparse
+import threading
+import time
+from collections import Counter
+
+import requests
+
+
+# -----------------------------
+# Open-loop load generator
+# -----------------------------
+# Requests are fired on a fixed schedule regardless of how fast the server
+# answers, so an overloaded server shows up as growing latency / rejections
+# rather than the generator politely slowing down (coordinated omission).
+# All requests come from one IP, so run the server with
+# VOICEIQ_RATE_PER_MINUTE=0 to exercise admission control on its own.
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+def fire(url, audio, results, lock):
+    started = time.perf_counter()
+    try:
+        response = requests.post(
+            url,
+            files={"file": ("question.wav", audio, "audio/wav")},
+            timeout=120
+        )
+        status = response.status_code
+    except Exception as e:
+        status = type(e).__name__
+    elapsed = time.perf_counter() - started
+
+    with lock:
+        results.append((status, elapsed))
+
+
+def run(url, audio, rate, duration):
+    results = []
+    lock = threading.Lock()
+    threads = []
+
+    interval = 1.0 / rate
+    started = time.perf_counter()
+    n = 0
+    while time.perf_counter() - started < duration:
+        t = threading.Thread(target=fire, args=(url, audio, results, lock), daemon=True)
+        t.start()
+        threads.append(t)
+        n += 1
+        next_at = started + n * interval
+        time.sleep(max(0.0, next_at - time.perf_counter()))
+
+    for t in threads:
+        t.join()
+
+    return results
+
+
+def report(results, wall):
+    statuses = Counter(status for status, _ in results)
+    print(f"\nSent {len(results)} requests in {wall:.1f}s")
+    for status, count in sorted(statuses.items(), key=lambda kv: str(kv[0])):
+        latencies = [t for s, t in results if s == status]
+        print(
+            f"  {status}: {count:>5}  "
+            f"p50={percentile(latencies, 50):.2f}s  "
+            f"p95={percentile(latencies, 95):.2f}s  "
+            f"p99={percentile(latencies, 99):.2f}s"
+        )
+
+    ok = [t for s, t in results if s == 200]
+    if ok:
+        print(f"Goodput: {len(ok) / wall:.2f} req/s, p99 of successes {percentile(ok, 99):.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop load test for /ask-voice")
+    parser.add_argument("audio", help="recording to upload on every request")
+    parser.add_argument("--url", default="http://localhost:8000/ask-voice")
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    args = parser.parse_args()
+
+    with open(args.audio, "rb") as f:
+        audio = f.read()
+
+    started = time.perf_counter()
+    results = run(args.url, audio, args.rate, args.duration)
+    report(results, time.perf_counter() - started)
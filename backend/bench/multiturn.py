@@ -0,0 +1,138 @@
+import argparse
+import json
+import time
+
+from backend.core.answer_engine import AnswerEngine, LLM_FACTORIES
+from backend.core.sessions import SessionStore
+from backend.llms.prompting import build_messages, flatten_messages
+
+
+# -----------------------------
+# Multi-turn token / latency comparison
+# -----------------------------
+# Replays scripted conversations twice: once statelessly (every question
+# retrieves and sends a fresh prompt) and once inside a session (history +
+# incrementally extended context with a stable prefix), then reports prompt
+# tokens, provider-reported cached tokens and latency per turn.
+#
+# --dry-run needs only the local index: it builds the prompts each turn would
+# send (with a placeholder answer as history) and reports how many leading
+# characters each shares with the previous turn's prompt, i.e. what a
+# provider prefix cache could reuse. No provider is called.
+
+PLACEHOLDER_ANSWER = "A placeholder answer of typical length. " * 15
+
+DEFAULT_SCRIPTS = [
+    [
+        "What curricula does Sunmarke offer?",
+        "Which of those is available in the sixth form?",
+        "How do I apply for it?",
+        "What are the fees for that year group?",
+    ],
+]
+
+
+def run_script(engine, questions, session=None):
+    rows = []
+    for turn, question in enumerate(questions, 1):
+        started = time.perf_counter()
+        # Every model, never the answer cache: routing or cache hits would
+        # make the stateless and session runs answer with different providers
+        results = engine.answer(question, session=session, models=list(LLM_FACTORIES), use_cache=False)
+        elapsed = time.perf_counter() - started
+
+        for model, result in results.items():
+            usage = (result.get("usage") or {}) if isinstance(result, dict) else {}
+            rows.append({
+                "turn": turn,
+                "model": model,
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "cached_tokens": usage.get("cached_tokens", 0),
+                "llm_seconds": result.get("seconds") if isinstance(result, dict) else None,
+                "turn_seconds": round(elapsed, 3),
+            })
+    return rows
+
+
+def shared_prefix(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def dry_run_script(engine, questions, session=None):
+    rows, previous = [], ""
+    for turn, question in enumerate(questions, 1):
+        chunks, blocks = engine.build_context(question, session=session)
+        context = "\n\n".join(chunk["content"] for chunk in chunks)
+        history = session.history("dry-run") if session is not None else None
+        prompt = flatten_messages(build_messages(question, context, history))
+
+        rows.append({
+            "turn": turn,
+            "chunks": len(chunks),
+            "prompt_chars": len(prompt),
+            "reused_chars": shared_prefix(previous, prompt),
+        })
+        previous = prompt
+
+        if session is not None:
+            session.context = blocks
+            session.add_turn(question, {"dry-run": PLACEHOLDER_ANSWER})
+    return rows
+
+
+def summarize_dry_run(label, rows):
+    total = sum(r["prompt_chars"] for r in rows)
+    reused = sum(r["reused_chars"] for r in rows)
+    print(f"\n{label}")
+    for r in rows:
+        print(f"  turn {r['turn']} chunks={r['chunks']:>2} prompt={r['prompt_chars']:>6} chars "
+              f"reusable prefix={r['reused_chars']:>6}")
+    print(f"  total prompt chars={total}, reusable={reused} ({100 * reused / total if total else 0:.0f}%)")
+
+
+def summarize(label, rows):
+    prompt = sum(r["prompt_tokens"] for r in rows)
+    cached = sum(r["cached_tokens"] for r in rows)
+    llm = [r["llm_seconds"] for r in rows if r["llm_seconds"] is not None]
+    print(f"\n{label}")
+    for r in rows:
+        print(
+            f"  turn {r['turn']} {r['model']:<9} prompt={r['prompt_tokens']:>5} "
+            f"cached={r['cached_tokens']:>5} llm={r['llm_seconds']}s"
+        )
+    print(
+        f"  total prompt tokens={prompt}, cached={cached} "
+        f"({100 * cached / prompt if prompt else 0:.0f}%), "
+        f"mean LLM latency={sum(llm) / len(llm) if llm else 0:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare stateless vs session answering on multi-turn scripts")
+    parser.add_argument("--scripts", help="JSON file: list of conversations, each a list of questions")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="no provider calls: measure prompt size and reusable prefix only")
+    args = parser.parse_args()
+
+    scripts = DEFAULT_SCRIPTS
+    if args.scripts:
+        with open(args.scripts, "r", encoding="utf-8") as f:
+            scripts = json.load(f)
+
+    store = SessionStore()
+
+    if args.dry_run:
+        # Retriever only; the LLM clients are never built
+        engine = AnswerEngine()
+        for i, questions in enumerate(scripts, 1):
+            summarize_dry_run(f"Script {i}: stateless", dry_run_script(engine, questions))
+            summarize_dry_run(f"Script {i}: session", dry_run_script(engine, questions, session=store.get_or_create()))
+    else:
+        engine = AnswerEngine().warmup()
+        for i, questions in enumerate(scripts, 1):
+            summarize(f"Script {i}: stateless", run_script(engine, questions))
+            summarize(f"Script {i}: session", run_script(engine, questions, session=store.get_or_create()))
@@ -0,0 +1,117 @@
+import argparse
+import json
+import random
+from collections import Counter
+
+from backend.config import PROVIDER_PRICES
+from backend.core.answer_engine import LLM_FACTORIES
+from backend.core.router import POLICIES, ModelRouter, percentile
+
+
+# -----------------------------
+# Routing policy simulation
+# -----------------------------
+# Replays recorded traffic (batch runner output made with all models, so
+# every provider's latency / failure / tokens is known for every question)
+# through a fresh router per policy. A request costs the sum of the chosen
+# providers' calls and takes as long as the slowest of them (they run in
+# parallel); it succeeds if at least one chosen provider succeeded.
+
+def load_recorded(path):
+    requests = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("error"):
+                continue
+
+            outcomes = {}
+            for model, answer in record["answers"].items():
+                usage = answer.get("usage") or {}
+                outcomes[model] = {
+                    "seconds": answer.get("llm_seconds") or 0.0,
+                    "failed": answer.get("failed", False),
+                    "rate_limited": answer.get("rate_limited", False),
+                    "tokens": usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0),
+                }
+            requests.append(outcomes)
+    return requests
+
+
+def synthetic(n, seed=0, outage=None):
+    """
+    Plausible traffic when no recording is at hand: (median s, spread, error
+    rate, tokens). With ``outage``, that provider fails every call, after a
+    30 s timeout, for the middle third of the run.
+    """
+    profiles = {
+        "Gemini": (1.6, 0.35, 0.02, 2300),
+        "Kimi": (3.2, 0.45, 0.08, 2600),
+        "DeepSeek": (3.0, 0.45, 0.05, 2600),
+    }
+    rng = random.Random(seed)
+    requests = []
+    for i in range(n):
+        down = n // 3 <= i < 2 * n // 3
+        outcomes = {}
+        for model, (median, spread, error_rate, tokens) in profiles.items():
+            failed = rng.random() < error_rate or (model == outage and down)
+            outcomes[model] = {
+                "seconds": 30.0 if model == outage and down else median * rng.lognormvariate(0, spread),
+                "failed": failed,
+                "rate_limited": failed and rng.random() < 0.7,
+                "tokens": int(tokens * rng.uniform(0.8, 1.2)),
+            }
+        requests.append(outcomes)
+    return requests
+
+
+def simulate(requests, policy):
+    router = ModelRouter({name: factory.model_id for name, factory in LLM_FACTORIES.items()}, policy=policy)
+    latencies, cost, successes, picks = [], 0.0, 0, Counter()
+
+    for outcomes in requests:
+        chosen, _ = router.select()
+        chosen = [name for name in chosen if name in outcomes]
+        if not chosen:
+            continue
+
+        for name in chosen:
+            o = outcomes[name]
+            router.record(name, o["seconds"], o["failed"], o["rate_limited"], o["tokens"])
+            cost += o["tokens"] * PROVIDER_PRICES.get(name, 0.0) / 1e6
+            picks[name] += 1
+
+        latencies.append(max(outcomes[name]["seconds"] for name in chosen))
+        successes += any(not outcomes[name]["failed"] for name in chosen)
+
+    return {
+        "requests": len(latencies),
+        "cost_usd": cost,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "success": successes / len(latencies) if latencies else 0.0,
+        "picks": dict(picks),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare routing policies on recorded or synthetic traffic")
+    parser.add_argument("recorded", nargs="?", help="batch runner output JSONL (run with all models)")
+    parser.add_argument("--synthetic", type=int, default=2000, help="requests to generate when no recording is given")
+    parser.add_argument("--outage", choices=list(LLM_FACTORIES),
+                        help="synthetic only: this provider is down for the middle third of the run")
+    args = parser.parse_args()
+
+    requests = load_recorded(args.recorded) if args.recorded else synthetic(args.synthetic, outage=args.outage)
+    results = {policy: simulate(requests, policy) for policy in POLICIES}
+    baseline = results["all"]["cost_usd"] or 1.0
+
+    print(f"{len(requests)} requests")
+    print(f"{'policy':<9} {'cost $':>9} {'saved':>6} {'p50 s':>6} {'p95 s':>6} {'p99 s':>6} {'success':>8}  picks")
+    for policy, r in results.items():
+        print(
+            f"{policy:<9} {r['cost_usd']:>9.4f} {100 * (1 - r['cost_usd'] / baseline):>5.0f}% "
+            f"{r['p50']:>6.2f} {r['p95']:>6.2f} {r['p99']:>6.2f} {100 * r['success']:>7.1f}%  {r['picks']}"
+        )
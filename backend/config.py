@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -11,10 +12,64 @@ KIMI_API_KEY = os.getenv("KIMI_API_KEY")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 OPENROUTER_API_KEY2 = os.getenv("OPENROUTER_API_KEY2")
+# -------- STARTUP --------
+# Load the embedding model, FAISS index and LLM clients at import time, then
+# freeze the GC so preforked workers (gunicorn --preload) share those pages.
+PRELOAD_MODELS = os.getenv("VOICEIQ_PRELOAD", "0") == "1"
+# Otherwise load them in a background thread once the worker has started.
+WARMUP_ON_STARTUP = os.getenv("VOICEIQ_WARMUP", "1") == "1"
+
+# -------- AUDIO UPLOADS --------
+MAX_UPLOAD_BYTES = int(os.getenv("VOICEIQ_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_AUDIO_SECONDS = int(os.getenv("VOICEIQ_MAX_AUDIO_SECONDS", "60"))
+# Re-encode to Ogg/Opus before STT (needs ffmpeg on PATH; falls back to WAV)
+AUDIO_ENCODE_OPUS = os.getenv("VOICEIQ_AUDIO_OPUS", "1") == "1"
+
+# -------- ADMISSION CONTROL --------
+# Per worker: requests answered at once, and how many may wait for a slot
+MAX_CONCURRENT_REQUESTS = int(os.getenv("VOICEIQ_MAX_CONCURRENT", "4"))
+MAX_QUEUED_REQUESTS = int(os.getenv("VOICEIQ_MAX_QUEUED", "8"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("VOICEIQ_QUEUE_TIMEOUT", "10"))
+# Per-client token bucket (0 disables)
+RATE_LIMIT_PER_MINUTE = float(os.getenv("VOICEIQ_RATE_PER_MINUTE", "10"))
+RATE_LIMIT_BURST = int(os.getenv("VOICEIQ_RATE_BURST", "3"))
+# Shared pool for provider calls (LLM + TTS), sized for the admitted load
+LLM_WORKERS = int(os.getenv("VOICEIQ_LLM_WORKERS", str(MAX_CONCURRENT_REQUESTS * 3)))
+
+# -------- SESSIONS --------
+SESSION_TTL_SECONDS = int(os.getenv("VOICEIQ_SESSION_TTL", "1800"))
+MAX_SESSIONS = int(os.getenv("VOICEIQ_MAX_SESSIONS", "1000"))
+SESSION_MAX_TURNS = int(os.getenv("VOICEIQ_SESSION_TURNS", "4"))
+SESSION_MAX_CHUNKS = int(os.getenv("VOICEIQ_SESSION_CHUNKS", "16"))
+# Follow-ups retrieve fewer chunks, so the context grows slowly and its prefix stays cacheable
+SESSION_FOLLOWUP_TOP_K = int(os.getenv("VOICEIQ_SESSION_FOLLOWUP_K", "4"))
+SESSION_MAX_ANSWER_CHARS = 1200
+
+# -------- MODEL ROUTING --------
+# "fastest" (one model), "best_two", or "all" (demo mode)
+ROUTING_POLICY = os.getenv("VOICEIQ_ROUTING", "best_two")
+# Blended USD per million tokens, used to estimate per-call cost
+PROVIDER_PRICES = json.loads(os.getenv(
+    "VOICEIQ_PROVIDER_PRICES",
+    '{"Gemini": 0.40, "DeepSeek": 0.50, "Kimi": 0.50}'
+))
+# Seconds of p90 latency considered equivalent to one cent per call
+ROUTING_COST_WEIGHT = float(os.getenv("VOICEIQ_ROUTING_COST_WEIGHT", "1.0"))
+
 # -------- PATHS --------
 PROMPT_PATH = "prompts/prompt.txt"
 DATA_DIR = "data"
 
+# -------- ANSWER CACHE --------
+# Pre-computed answers (filled by `python -m backend.core.batch --populate-cache`)
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ANSWER_CACHE_PATH = os.getenv("VOICEIQ_ANSWER_CACHE", os.path.join(_BACKEND_DIR, "data", "answer_cache.sqlite"))
+ANSWER_AUDIO_DIR = os.getenv("VOICEIQ_ANSWER_AUDIO", os.path.join(_BACKEND_DIR, "data", "answer_audio"))
+ANSWER_CACHE_ENABLED = os.getenv("VOICEIQ_ANSWER_CACHE_ENABLED", "1") == "1"
+# Cached answers older than this are ignored (0 = never expire); entries also
+# stop matching as soon as the prompt, knowledge base or model changes
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("VOICEIQ_ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+
 # -------- VALIDATION --------
 def validate_env():
     missing = []
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from backend.config import ANSWER_CACHE_PATH, ANSWER_AUDIO_DIR, ANSWER_CACHE_TTL_SECONDS
+from backend.core.rag import CHUNKS_FILE, CHUNK_STORE_FILE, EMBEDDINGS_FILE
+from backend.llms.prompting import PROMPT_PATH
+
+
+def normalize_question(question):
+    """Case/punctuation/whitespace-insensitive form used as the cache key."""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+def answer_key(question, model):
+    return hashlib.sha1(f"{model}\n{normalize_question(question)}".encode("utf-8")).hexdigest()
+
+
+def content_fingerprint():
+    """
+    Hash of everything a cached answer was generated from besides the
+    question and model: the prompt template and the knowledge base files
+    (by size and mtime, so re-ingesting the site invalidates the cache).
+    """
+    digest = hashlib.sha1()
+    with open(PROMPT_PATH, "rb") as f:
+        digest.update(f.read())
+    for path in (CHUNK_STORE_FILE, CHUNKS_FILE, EMBEDDINGS_FILE):
+        if os.path.exists(path):
+            st = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """
+    Pre-computed answers keyed by (normalized question, model), stored in
+    SQLite so the batch runner can fill it offline while API workers read
+    it. Audio is kept as MP3 files under ``audio_dir`` and referenced by path.
+
+    Each entry records the content fingerprint and upstream model ID it was
+    generated with; entries that no longer match, or are older than ``ttl``
+    seconds, are treated as misses. Nothing is opened until first use.
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, audio_dir=ANSWER_AUDIO_DIR, ttl=ANSWER_CACHE_TTL_SECONDS):
+        self.path = path
+        self.audio_dir = audio_dir
+        self.ttl = ttl
+        self._local = threading.local()
+        self._fingerprint = None
+
+    def _conn(self):
+        # One connection per thread (and per process: a connection opened
+        # before a preload fork must not be reused by the workers). WAL lets
+        # API workers keep reading while a batch run writes.
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS answers (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        question TEXT NOT NULL,
+                        text TEXT NOT NULL,
+                        audio_path TEXT,
+                        chunk_ids TEXT,
+                        version TEXT NOT NULL,
+                        created REAL NOT NULL
+                    )
+                    """
+                )
+            self._local.conn = conn
+            self._local.pid = pid
+        return self._local.conn
+
+    def version(self, model_id=""):
+        if self._fingerprint is None:
+            self._fingerprint = content_fingerprint()
+        return hashlib.sha1(f"{self._fingerprint}\n{model_id}".encode("utf-8")).hexdigest()
+
+    def get(self, question, model, model_id=""):
+        # Serving without a populated cache must not create an empty database
+        if not os.path.exists(self.path):
+            return None
+
+        row = self._conn().execute(
+            "SELECT text, audio_path, chunk_ids, version, created FROM answers WHERE key = ?",
+            (answer_key(question, model),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        text, audio_path, chunk_ids, version, created = row
+        if version != self.version(model_id):
+            return None
+        if self.ttl and time.time() - created > self.ttl:
+            return None
+
+        if audio_path and not os.path.exists(audio_path):
+            audio_path = None
+        return {
+            "text": text,
+            "audio": audio_path,
+            "chunk_ids": json.loads(chunk_ids) if chunk_ids else [],
+        }
+
+    def save_audio(self, question, model, audio_bytes):
+        """Write MP3 bytes next to the cache and return the file path."""
+        os.makedirs(self.audio_dir, exist_ok=True)
+        path = os.path.join(self.audio_dir, f"{answer_key(question, model)}.mp3")
+        with open(path, "wb") as f:
+            f.write(audio_bytes)
+        return path
+
+    def put(self, question, model, text, audio_path=None, chunk_ids=None, model_id=""):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    answer_key(question, model), model, question, text,
+                    audio_path, json.dumps(chunk_ids or []), self.version(model_id), time.time(),
+                )
+            )
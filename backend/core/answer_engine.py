@@ -1,79 +1,269 @@
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from backend.config import LLM_WORKERS, SESSION_FOLLOWUP_TOP_K
 from backend.core.rag import RAGRetriever
+from backend.core.router import ModelRouter
+from backend.core.sessions import extend_context
 from backend.llms.gemini import GeminiLLM
 from backend.llms.kimi import KimiLLM
 from backend.llms.deepseek import DeepSeekLLM
 from backend.voice.tts import text_to_speech
 
 
+# One pool per process for all provider calls, instead of a fresh pool per
+# request; admission control in the API keeps the queue in front of it short.
+_executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+
+LLM_FACTORIES = {
+    "Gemini": GeminiLLM,
+    "Kimi": KimiLLM,
+    "DeepSeek": DeepSeekLLM,
+}
+
+
 class AnswerEngine:
-    def __init__(self):
-        # -----------------------------
-        # Initialize RAG
-        # -----------------------------
-        self.retriever = RAGRetriever()
+    """
+    Retrieval + multi-LLM orchestration.
 
-        # -----------------------------
-        # Initialize LLMs
-        # -----------------------------
-        self.llms = {
-            "Gemini": GeminiLLM(),
-            "Kimi": KimiLLM(),
-            "DeepSeek": DeepSeekLLM(),
-        }
+    Construction is cheap: the embedding model, FAISS index and LLM clients
+    are built on first use (or eagerly via ``warmup()``), so importing the
+    API does not pay for torch/faiss until a request actually needs them.
+    """
+
+    def __init__(self, cache=None):
+        self._lock = threading.Lock()
+        self._retriever = None
+        self._llms = None
+        self.load_seconds = None
+
+        # Optional AnswerCache of pre-computed answers for stateless questions
+        self.cache = cache
+        # Optional per-provider TokenBuckets (the batch runner sets these)
+        self.provider_limits = {}
+
+        # Picks which LLMs answer each request from rolling provider stats
+        self.router = ModelRouter({name: factory.model_id for name, factory in LLM_FACTORIES.items()})
+
+    # -----------------------------
+    # Lazy initialization
+    # -----------------------------
+    @property
+    def retriever(self):
+        if self._retriever is None:
+            with self._lock:
+                if self._retriever is None:
+                    self._retriever = RAGRetriever()
+        return self._retriever
+
+    @property
+    def llms(self):
+        if self._llms is None:
+            with self._lock:
+                if self._llms is None:
+                    self._llms = {name: factory() for name, factory in LLM_FACTORIES.items()}
+        return self._llms
+
+    @property
+    def ready(self):
+        return self._retriever is not None and self._llms is not None
+
+    def warmup(self):
+        """Load the embedding model, index and LLM clients now."""
+        started = time.perf_counter()
+        self.retriever
+        self.llms
+        if self.load_seconds is None:
+            self.load_seconds = round(time.perf_counter() - started, 3)
+        return self
 
     # -----------------------------
     # Generate answers + voice
     # -----------------------------
-    def answer(self, question, top_k=8):
-        #  Retrieve context
-        chunks = self.retriever.retrieve(question, top_k=top_k)
-        
-        print(f"\n🔍 DEBUG: Question: {question}")
-        print(f"🔍 DEBUG: Retrieved {len(chunks)} chunks")
-        if chunks:
-            print(f"🔍 DEBUG: First chunk preview: {chunks[0]['content'][:150]}...")
-
-        if not chunks:
-            return {
-                "error": "No relevant context found on Sunmarke website"
-            }
+    def answer(self, question, top_k=8, session=None, **options):
+        """Per-model answers only; see ``run`` for the options."""
+        return self.run(question, top_k=top_k, session=session, **options)["answers"]
+
+    def run(self, question, top_k=8, session=None, models=None, speak=True, use_cache=True, policy=None):
+        """
+        Answer ``question`` with each LLM in ``models``; if not given, the
+        router chooses them using ``policy`` (default: ROUTING_POLICY).
+
+        With a ``session`` the question is treated as a follow-up: prior
+        turns are sent as history, the existing context is extended rather
+        than replaced, and the session is updated with this turn.
+        ``speak=False`` skips TTS. Returns ``{"answers": {model: {...}},
+        "chunk_ids": [...], "timings": {...}, "routing": {...}}``.
+        """
+        if models:
+            names = list(models)
+            routing = {"policy": "explicit", "selected": names}
+        else:
+            names, routing = self.router.select(policy)
+
+        if session is None:
+            result = self._run(question, top_k, None, names, speak, use_cache)
+        else:
+            with session.lock:
+                result = self._run(question, top_k, session, names, speak, use_cache)
+
+        result["routing"] = routing
+        return result
+
+    def build_context(self, question, top_k=8, session=None):
+        """
+        Retrieve context chunks; returns (chunks in prompt order, chunk-ID
+        blocks for the session). Follow-ups search with the previous
+        question too, take fewer chunks and extend the existing context.
+        """
+        if session is None or not session.context:
+            chunks = self.retriever.retrieve(question, top_k=top_k)
+            return chunks, ([[c["chunk_id"] for c in chunks]] if chunks else [])
 
-        # Merge chunks into context
-        context = "\n\n".join(chunk["content"] for chunk in chunks)
+        retrieved = self.retriever.retrieve(
+            session.retrieval_query(question), top_k=min(top_k, SESSION_FOLLOWUP_TOP_K)
+        )
+        blocks = extend_context(session.context, [c["chunk_id"] for c in retrieved])
+        return self.retriever.get_chunks([cid for block in blocks for cid in block]), blocks
 
+    def _run(self, question, top_k, session, names, speak, use_cache):
+        started = time.perf_counter()
+        timings = {}
         results = {}
+        chunk_ids = []
+        context_blocks = []
+        tts_futures = {}
 
         # -----------------------------
-        # 2️ Run LLMs in parallel
+        # 1️ Pre-computed answers (stateless questions only)
         # -----------------------------
-        with ThreadPoolExecutor(max_workers=3) as executor:
+        if use_cache and self.cache is not None and (session is None or not session.turns):
+            for name in names:
+                hit = self.cache.get(question, name, self.router.model_ids[name])
+                if hit is not None:
+                    results[name] = {
+                        "text": hit["text"],
+                        "audio": hit["audio"] if speak else None,
+                        "cached": True
+                    }
+                    chunk_ids = hit["chunk_ids"]
+
+            # Entries saved without audio (batch --no-tts, or the MP3 was
+            # deleted) still answer by voice: speak the cached text while
+            # any remaining models generate
+            unspoken = [name for name, result in results.items() if speak and not result["audio"]]
+            tts_futures = {
+                _executor.submit(text_to_speech, results[name]["text"], return_bytes=True): name
+                for name in unspoken
+            }
+
+        pending = [name for name in names if name not in results]
+
+        if pending:
+            #  Retrieve context
+            retrieval_started = time.perf_counter()
+            chunks, context_blocks = self.build_context(question, top_k, session)
+            timings["retrieval"] = round(time.perf_counter() - retrieval_started, 3)
+
+            print(f"\n🔍 DEBUG: Question: {question}")
+            print(f"🔍 DEBUG: Retrieved {len(chunks)} chunks")
+            if chunks:
+                print(f"🔍 DEBUG: First chunk preview: {chunks[0]['content'][:150]}...")
+
+            if not chunks:
+                return {
+                    "answers": {"error": "No relevant context found on Sunmarke website"},
+                    "chunk_ids": [],
+                    "timings": timings
+                }
+
+            # Merge chunks into context
+            context = "\n\n".join(chunk["content"] for chunk in chunks)
+            chunk_ids = [chunk["chunk_id"] for chunk in chunks]
+
+            # -----------------------------
+            # 2️ Run LLMs (+ voice) in parallel on the shared pool
+            # -----------------------------
             future_map = {
-                executor.submit(llm.generate, question, context): name
-                for name, llm in self.llms.items()
+                _executor.submit(
+                    self._generate_and_speak, name, self.llms[name], question, context,
+                    session.history(name) if session is not None else None, speak
+                ): name
+                for name in pending
             }
 
             for future in as_completed(future_map):
                 name = future_map[future]
 
                 try:
-                    text_answer = future.result()
-                    print(f"✅ {name} Response: {text_answer[:100]}...")
-
-                    # 3️⃣ Generate voice for each answer (MP3 bytes; avoids filesystem writes)
-                    audio_bytes = text_to_speech(text_answer, return_bytes=True)
-
-                    results[name] = {
-                        "text": text_answer,
-                        "audio": audio_bytes
-                    }
+                    results[name] = future.result()
+                    print(f"✅ {name} Response: {results[name]['text'][:100]}...")
 
                 except Exception as e:
                     print(f"❌ {name} Exception: {str(e)}")
                     results[name] = {
                         "text": f"{name} failed: {e}",
-                        "audio": None
+                        "audio": None,
+                        "failed": True
                     }
 
-        return results
+        for future in as_completed(tts_futures):
+            name = tts_futures[future]
+            try:
+                results[name]["audio"] = future.result()
+            except Exception as e:
+                print(f"⚠️ {name} TTS failed: {e}")
+
+        if session is not None:
+            session.context = context_blocks or ([chunk_ids] if chunk_ids else [])
+            session.add_turn(question, {
+                name: result["text"] for name, result in results.items() if not result.get("failed")
+            })
+
+        timings["total"] = round(time.perf_counter() - started, 3)
+        return {"answers": results, "chunk_ids": chunk_ids, "timings": timings}
+
+    def _generate_and_speak(self, name, llm, question, context, history=None, speak=True):
+        limiter = self.provider_limits.get(name)
+        if limiter is not None:
+            limiter.acquire()
+
+        usage, status = {}, {}
+        started = time.perf_counter()
+        try:
+            text_answer = llm.generate(question, context, history=history, usage=usage, status=status)
+        except Exception:
+            self.router.record(name, round(time.perf_counter() - started, 3), failed=True)
+            raise
+
+        result = {
+            "text": text_answer,
+            "audio": None,
+            "usage": usage,
+            "seconds": round(time.perf_counter() - started, 3),
+            "failed": status.get("failed", False),
+            "rate_limited": status.get("rate_limited", False)
+        }
+
+        # Provider health reflects the LLM call alone, recorded before TTS so
+        # a speech failure never counts against the model
+        self.router.record(
+            name,
+            result["seconds"],
+            failed=result["failed"],
+            rate_limited=result["rate_limited"],
+            tokens=usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+        )
+
+        if speak:
+            # 3️⃣ Generate voice for the answer (MP3 bytes; avoids filesystem writes)
+            started = time.perf_counter()
+            try:
+                result["audio"] = text_to_speech(text_answer, return_bytes=True)
+            except Exception as e:
+                # The text answer still stands; the card just has no voice
+                print(f"⚠️ {name} TTS failed: {e}")
+            result["tts_seconds"] = round(time.perf_counter() - started, 3)
+
+        return result
@@ -0,0 +1,206 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from backend.core.answer_cache import AnswerCache
+from backend.core.answer_engine import AnswerEngine, LLM_FACTORIES
+from backend.core.limits import TokenBucket
+
+
+# -----------------------------
+# Input / checkpoint
+# -----------------------------
+def question_id(record):
+    """Stable ID for a question: its own ``id`` field, else a hash of the text."""
+    if record.get("id") is not None:
+        return str(record["id"])
+    return hashlib.sha1(record["question"].encode("utf-8")).hexdigest()[:16]
+
+
+def load_questions(path):
+    """JSONL of {"question": ..., "id": optional}; bare JSON strings also work."""
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"question": record}
+            record["id"] = question_id(record)
+            questions.append(record)
+    return questions
+
+
+def completed_ids(output_path, models):
+    """
+    IDs already answered successfully by every one of ``models``. The output
+    doubles as the checkpoint: each result is flushed as one line, so after
+    a crash only a truncated last line can be lost, and it is simply re-run.
+    Questions where any model failed are re-run as well, with the retry
+    appended after the failed attempt; ones with no relevant context are not.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("no_context"):
+                done.add(record["id"])
+                continue
+
+            answers = record.get("answers") or {}
+            if not record.get("error") and all(
+                model in answers and not answers[model].get("failed") for model in models
+            ):
+                done.add(record["id"])
+    return done
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+class BatchRunner:
+    def __init__(self, engine, output_path, models=None, speak=True,
+                 cache=None, populate_cache=False, concurrency=4):
+        self.engine = engine
+        self.output_path = output_path
+        self.models = models or list(LLM_FACTORIES)
+        self.speak = speak
+        self.cache = cache
+        self.populate_cache = populate_cache
+        self.concurrency = concurrency
+        self._write_lock = threading.Lock()
+
+    def answer_one(self, record):
+        question = record["question"]
+        # Always ask the providers: reading answers back out of the cache we
+        # are filling would make re-runs and evaluations meaningless. Models
+        # are explicit (all by default) rather than routed, so the output is
+        # comparable across runs and can be replayed by bench.routing_sim.
+        run = self.engine.run(question, models=self.models, speak=self.speak, use_cache=False)
+
+        answers = run["answers"]
+        if "error" in answers:
+            # Retrieval found nothing: deterministic for a given index, so
+            # the question counts as done rather than being re-run forever
+            return {"id": record["id"], "question": question, "error": answers["error"],
+                    "no_context": True, "timings": run["timings"]}
+
+        out = {}
+        for model, result in answers.items():
+            audio_path = None
+            if result.get("audio") and self.cache is not None:
+                audio_path = self.cache.save_audio(question, model, result["audio"])
+
+            if self.populate_cache and not result.get("failed"):
+                self.cache.put(question, model, result["text"], audio_path, run["chunk_ids"],
+                               model_id=LLM_FACTORIES[model].model_id)
+
+            out[model] = {
+                "text": result["text"],
+                "audio": audio_path,
+                "failed": bool(result.get("failed")),
+                "rate_limited": bool(result.get("rate_limited")),
+                "usage": result.get("usage"),
+                "llm_seconds": result.get("seconds"),
+                "tts_seconds": result.get("tts_seconds"),
+            }
+
+        return {
+            "id": record["id"],
+            "question": question,
+            "answers": out,
+            "chunk_ids": run["chunk_ids"],
+            "timings": run["timings"],
+        }
+
+    def write(self, f, record):
+        with self._write_lock:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def run(self, questions):
+        done = completed_ids(self.output_path, self.models)
+        todo = [q for q in questions if q["id"] not in done]
+        print(f"📋 {len(questions)} questions, {len(done)} already done, {len(todo)} to run")
+
+        started = time.perf_counter()
+        failures = no_context = 0
+
+        with open(self.output_path, "a", encoding="utf-8") as f, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self.answer_one, q): q for q in todo}
+
+            for n, future in enumerate(as_completed(futures), 1):
+                record = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"id": record["id"], "question": record["question"], "error": str(e)}
+
+                if result.get("no_context"):
+                    no_context += 1
+                elif result.get("error") or any(a["failed"] for a in result["answers"].values()):
+                    failures += 1
+                self.write(f, result)
+
+                if n % 10 == 0 or n == len(todo):
+                    rate = n / (time.perf_counter() - started)
+                    print(f"  {n}/{len(todo)} done ({rate:.2f}/s, {failures} failed, {no_context} without context)")
+
+        return failures
+
+
+# -----------------------------
+# Main
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions offline")
+    parser.add_argument("questions", help="input JSONL ({\"id\": ..., \"question\": ...} per line)")
+    parser.add_argument("output", help="output JSONL; re-running with the same file resumes")
+    parser.add_argument("--models", help=f"comma-separated subset of {','.join(LLM_FACTORIES)}")
+    parser.add_argument("--no-tts", action="store_true", help="skip text-to-speech")
+    parser.add_argument("--concurrency", type=int, default=4, help="questions in flight at once")
+    parser.add_argument("--rate", type=float, default=30.0, help="max calls per minute per provider")
+    parser.add_argument("--populate-cache", action="store_true",
+                        help="write answers into the API's answer cache")
+    args = parser.parse_args()
+
+    models = args.models.split(",") if args.models else None
+    unknown = set(models or []) - set(LLM_FACTORIES)
+    if unknown:
+        parser.error(f"unknown models: {', '.join(sorted(unknown))}")
+
+    engine = AnswerEngine().warmup()
+    per_second = args.rate / 60.0
+    engine.provider_limits = {
+        name: TokenBucket(per_second, burst=1) for name in (models or LLM_FACTORIES)
+    }
+
+    # Audio files live next to the cache even when not populating it, so the
+    # output's audio references stay valid.
+    cache = AnswerCache() if (args.populate_cache or not args.no_tts) else None
+
+    runner = BatchRunner(
+        engine,
+        args.output,
+        models=models,
+        speak=not args.no_tts,
+        cache=cache,
+        populate_cache=args.populate_cache,
+        concurrency=args.concurrency,
+    )
+    failures = runner.run(load_questions(args.questions))
+    print(f"🎉 Batch finished ({failures} failed; re-run to retry them)")
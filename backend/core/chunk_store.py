@@ -0,0 +1,281 @@
+import json
+import mmap
+import struct
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:  # optional: falls back to zlib
+    zstandard = None
+
+
+# -----------------------------
+# File layout
+# -----------------------------
+# header | block 0 | block 1 | ... | tables | index
+#
+# header: magic, codec, chunks per block, chunk count, block count,
+#         tables offset/length, index offset
+# block:  compressed run of records, each  <chunk_id, url#, title#, len> + utf-8 text
+# tables: compressed JSON {"urls": [...], "titles": [...]} (each string stored once)
+# index:  block offsets (u64), block lengths (u32), chunk ids (u32) in store order
+#
+# Only the header, tables and index are read up front; blocks are
+# decompressed on demand and kept in a small LRU.
+
+MAGIC = b"VIQCHNK1"
+HEADER = struct.Struct("<8sBIIIQQQ")
+RECORD = struct.Struct("<IIII")
+
+CODEC_ZLIB = 0
+CODEC_ZSTD = 1
+
+DEFAULT_BLOCK_SIZE = 32
+DEFAULT_CACHE_BLOCKS = 64
+
+
+def _compressor(codec):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=9).compress
+    return lambda data: zlib.compress(data, 9)
+
+
+def _decompressor(codec):
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Chunk store is zstd-compressed; install the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress
+    return zlib.decompress
+
+
+# -----------------------------
+# Writer
+# -----------------------------
+def write_chunk_store(path, chunks, block_size=DEFAULT_BLOCK_SIZE, codec=None):
+    """
+    Write ``chunks`` (dicts with chunk_id/source_url/title/content, as made
+    by ingest.create_chunks) to a block-compressed store at ``path``.
+    """
+    if codec is None:
+        codec = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+    compress = _compressor(codec)
+
+    urls, titles = {}, {}
+    offsets, lengths = array("Q"), array("I")
+    chunk_ids = array("I")
+
+    with open(path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+
+        for start in range(0, len(chunks), block_size):
+            payload = bytearray()
+            for chunk in chunks[start:start + block_size]:
+                url_idx = urls.setdefault(chunk["source_url"], len(urls))
+                title_idx = titles.setdefault(chunk["title"], len(titles))
+                text = chunk["content"].encode("utf-8")
+                payload += RECORD.pack(chunk["chunk_id"], url_idx, title_idx, len(text))
+                payload += text
+                chunk_ids.append(chunk["chunk_id"])
+
+            block = compress(bytes(payload))
+            offsets.append(f.tell())
+            lengths.append(len(block))
+            f.write(block)
+
+        tables_offset = f.tell()
+        tables = compress(json.dumps(
+            {"urls": list(urls), "titles": list(titles)}, ensure_ascii=False
+        ).encode("utf-8"))
+        f.write(tables)
+
+        index_offset = f.tell()
+        f.write(offsets.tobytes())
+        f.write(lengths.tobytes())
+        f.write(chunk_ids.tobytes())
+
+        f.seek(0)
+        f.write(HEADER.pack(
+            MAGIC, codec, block_size, len(chunks), len(offsets),
+            tables_offset, len(tables), index_offset
+        ))
+
+
+def page_records(pages):
+    """
+    Crawled pages (url/title/content, as saved to pages.json) as store
+    records, keyed by their position, so page text can use the same store.
+    """
+    return [
+        {"chunk_id": i, "source_url": page["url"], "title": page["title"], "content": page["content"]}
+        for i, page in enumerate(pages)
+    ]
+
+
+# -----------------------------
+# Reader
+# -----------------------------
+class ChunkStore:
+    """
+    Read-only, random-access view of a chunk store. Behaves like the list
+    of chunk dicts it replaces (``len``, indexing by position), but only the
+    blocks holding requested chunks are decompressed. The file is memory
+    mapped, so preforked workers share its pages.
+    """
+
+    def __init__(self, path, cache_blocks=DEFAULT_CACHE_BLOCKS):
+        self.path = path
+        self.cache_blocks = cache_blocks
+
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, codec, self.block_size, self.count, n_blocks,
+         tables_offset, tables_length, index_offset) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a chunk store: {path}")
+
+        self._decompress = _decompressor(codec)
+
+        tables = json.loads(self._decompress(self._mm[tables_offset:tables_offset + tables_length]))
+        self.urls = tables["urls"]
+        self.titles = tables["titles"]
+
+        pos = index_offset
+        self._offsets = array("Q", self._mm[pos:pos + 8 * n_blocks])
+        pos += 8 * n_blocks
+        self._lengths = array("I", self._mm[pos:pos + 4 * n_blocks])
+        pos += 4 * n_blocks
+        self.chunk_ids = array("I", self._mm[pos:pos + 4 * self.count])
+
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self.count
+        if not 0 <= position < self.count:
+            raise IndexError("chunk position out of range")
+
+        block_no, slot = divmod(position, self.block_size)
+        return dict(self._block(block_no)[slot])
+
+    def _block(self, block_no):
+        with self._lock:
+            records = self._blocks.get(block_no)
+            if records is not None:
+                self._blocks.move_to_end(block_no)
+                return records
+
+        start = self._offsets[block_no]
+        payload = self._decompress(self._mm[start:start + self._lengths[block_no]])
+
+        records = []
+        pos = 0
+        while pos < len(payload):
+            chunk_id, url_idx, title_idx, length = RECORD.unpack_from(payload, pos)
+            pos += RECORD.size
+            records.append({
+                "chunk_id": chunk_id,
+                "source_url": self.urls[url_idx],
+                "title": self.titles[title_idx],
+                "content": payload[pos:pos + length].decode("utf-8"),
+            })
+            pos += length
+
+        with self._lock:
+            self._blocks[block_no] = records
+            while len(self._blocks) > self.cache_blocks:
+                self._blocks.popitem(last=False)
+        return records
+
+    def close(self):
+        self._mm.close()
+
+
+# -----------------------------
+# Build / benchmark from chunks.json
+# -----------------------------
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+    import os
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Build or benchmark a compressed chunk store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="convert chunks.json (or pages.json with --pages) to a store")
+    build.add_argument("source_json")
+    build.add_argument("store")
+    build.add_argument("--pages", action="store_true", help="source is pages.json rather than chunks.json")
+    build.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    build.add_argument("--zlib", action="store_true", help="force zlib even if zstandard is installed")
+
+    bench = sub.add_parser("bench", help="RSS and lookup latency: JSON list vs store")
+    bench.add_argument("chunks_json")
+    bench.add_argument("store")
+    bench.add_argument("--lookups", type=int, default=2000)
+    bench.add_argument("--top-k", type=int, default=8)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with open(args.source_json, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        if args.pages:
+            records = page_records(records)
+        write_chunk_store(args.store, records, block_size=args.block_size,
+                          codec=CODEC_ZLIB if args.zlib else None)
+        print(f"{len(records)} records: {os.path.getsize(args.source_json)} → "
+              f"{os.path.getsize(args.store)} bytes on disk")
+
+    else:
+        def rss_kb():
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+            return 0
+
+        def lookup_latency(chunks):
+            rng = random.Random(0)
+            queries = [rng.sample(range(len(chunks)), args.top_k) for _ in range(args.lookups)]
+            started = time.perf_counter()
+            for positions in queries:
+                for p in positions:
+                    chunks[p]
+            return (time.perf_counter() - started) / args.lookups * 1e6
+
+        def load_list():
+            with open(args.chunks_json, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        def measure(load, results):
+            # In a forked child, so each variant starts from the same baseline
+            # and freed memory can't hide in the parent's allocator. RSS is
+            # taken after the lookups, so touched mmap pages are counted.
+            before = rss_kb()
+            chunks = load()
+            latency = lookup_latency(chunks)
+            results.put((rss_kb() - before, latency))
+
+        ctx = multiprocessing.get_context("fork")
+        report = {}
+        for name, load in (("list", load_list), ("store", lambda: ChunkStore(args.store))):
+            results = ctx.Queue()
+            proc = ctx.Process(target=measure, args=(load, results))
+            proc.start()
+            report[name] = results.get()
+            proc.join()
+
+        print(f"RSS growth (load + {args.lookups} top-{args.top_k} lookups): "
+              f"list {report['list'][0] / 1024:.1f} MB, store {report['store'][0] / 1024:.1f} MB")
+        print(f"top-{args.top_k} lookup: list {report['list'][1]:.1f} µs, "
+              f"store {report['store'][1]:.1f} µs (LRU of {DEFAULT_CACHE_BLOCKS} blocks)")
@@ -7,6 +7,8 @@ from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 from sentence_transformers import SentenceTransformer
 
+from backend.core.chunk_store import page_records, write_chunk_store
+
 # -----------------------------
 # Config
 # -----------------------------
@@ -176,8 +178,9 @@ def generate_embeddings(chunks, model):
 # -----------------------------
 
 def save_json(filename, data):
+    # Compact separators: indentation alone was a large share of pages.json
     with open(f"{OUTPUT_DIR}/{filename}", "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+        json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
 
 
 # -----------------------------
@@ -208,6 +211,8 @@ if __name__ == "__main__":
 
     save_json("pages.json", relevant_pages)
     save_json("chunks.json", chunks)
+    write_chunk_store(os.path.join(OUTPUT_DIR, "chunks.store"), chunks)
+    write_chunk_store(os.path.join(OUTPUT_DIR, "pages.store"), page_records(relevant_pages))
     save_json("embeddings.json", embeddings)
 
     print("🎉 Ingestion completed successfully")
@@ -0,0 +1,152 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; carries a Retry-After hint."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+# -----------------------------
+# Global concurrency limit
+# -----------------------------
+class AdmissionController:
+    """
+    Caps in-flight requests per worker with a bounded wait queue.
+
+    When every slot is busy and the queue is full, requests are rejected
+    immediately rather than piling up threads and provider sockets; queued
+    requests that wait longer than ``queue_timeout`` are rejected too.
+    All state is touched only from the event loop, so no lock is needed.
+    """
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        # Smoothed request service time, used for Retry-After estimates
+        self._service_time = 5.0
+
+    def retry_after(self):
+        backlog = self.waiting + 1
+        return self._service_time * backlog / self.max_concurrent
+
+    def check(self):
+        """
+        Non-blocking capacity check; raises Overloaded when every slot and
+        queue place is taken. Cheap enough to run before a request body is read.
+        """
+        # Count occupancy directly: semaphore.locked() lags behind a burst of
+        # arrivals that haven't been scheduled yet.
+        if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+            self.rejected += 1
+            raise Overloaded("Server is at capacity", self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self):
+        self.check()
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded("Timed out waiting for capacity", self.retry_after())
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
+
+
+# -----------------------------
+# Token buckets
+# -----------------------------
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, up to ``burst``."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available. Returns 0 on success, else seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available (for worker threads, not the event loop)."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+class ClientRateLimiter:
+    """
+    Per-client token buckets, keyed by e.g. client IP. Only the
+    ``max_clients`` most recently seen clients are tracked so memory stays
+    bounded; an evicted client simply starts again with a full bucket.
+    """
+
+    def __init__(self, per_minute, burst, max_clients=10000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key):
+        """Returns 0 if the request is allowed, else seconds until it would be."""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+
+        return bucket.try_acquire()
@@ -1,8 +1,8 @@
 import json
 import os
-import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from backend.core.chunk_store import ChunkStore
 
 
 # -----------------------------
@@ -10,6 +10,7 @@ from sentence_transformers import SentenceTransformer
 # -----------------------------
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 CHUNKS_FILE = os.path.join(DATA_DIR, "chunks.json")
+CHUNK_STORE_FILE = os.path.join(DATA_DIR, "chunks.store")  # preferred over chunks.json when present
 EMBEDDINGS_FILE = os.path.join(DATA_DIR, "embeddings.json")
 
 TOP_K = 5  # number of chunks to retrieve
@@ -34,6 +35,10 @@ def build_faiss_index(embeddings):
     if len(embeddings) == 0:
         raise ValueError("No embeddings found to build FAISS index")
 
+    # Imported here so that importing this module stays cheap; faiss is only
+    # needed once the index is actually built.
+    import faiss
+
     vectors = np.array([e["embedding"] for e in embeddings]).astype("float32")
 
     dim = vectors.shape[1]  # embedding size
@@ -49,18 +54,41 @@ def build_faiss_index(embeddings):
 class RAGRetriever:
     def __init__(self):
         try:
+            # sentence_transformers pulls in torch, so defer it until the
+            # retriever is actually constructed.
+            from sentence_transformers import SentenceTransformer
+
             # Important: this model must match the one used to generate embeddings.json,
             # otherwise FAISS search will fail due to dimension mismatch.
             self.model = SentenceTransformer(EMBEDDING_MODEL_NAME)
 
-            self.chunks = load_json(CHUNKS_FILE)
-            self.embeddings = load_json(EMBEDDINGS_FILE)
+            # The compressed store keeps chunk text on disk and decompresses
+            # only the blocks a query touches; chunks.json is the fallback.
+            if os.path.exists(CHUNK_STORE_FILE):
+                self.chunks = ChunkStore(CHUNK_STORE_FILE)
+                chunk_ids = self.chunks.chunk_ids
+            else:
+                self.chunks = load_json(CHUNKS_FILE)
+                chunk_ids = [chunk["chunk_id"] for chunk in self.chunks]
+
+            # Only needed to build the index: the parsed JSON (a list of floats
+            # plus a URL per chunk) is far larger than the float32 index, so
+            # it is not kept on the retriever.
+            self.index = build_faiss_index(load_json(EMBEDDINGS_FILE))
 
-            self.index = build_faiss_index(self.embeddings)
+            # chunk_id → list position, for looking chunks up again by ID
+            # (e.g. a conversation's existing context)
+            self._positions = {cid: i for i, cid in enumerate(chunk_ids)}
 
         except Exception as e:
             raise RuntimeError(f"Failed to initialize RAG system: {e}")
 
+    # -----------------------------
+    # Look up chunks by ID
+    # -----------------------------
+    def get_chunks(self, chunk_ids):
+        return [self.chunks[self._positions[cid]] for cid in chunk_ids if cid in self._positions]
+
     # -----------------------------
     # Retrieve relevant chunks
     # -----------------------------
@@ -0,0 +1,189 @@
+import threading
+from collections import deque
+
+from backend.config import ROUTING_POLICY, PROVIDER_PRICES, ROUTING_COST_WEIGHT
+
+POLICIES = ("fastest", "best_two", "all")
+
+MIN_SAMPLES = 5            # below this a provider is still being explored
+MAX_ERROR_RATE = 0.5       # above this (or the 429 rate) a provider is unhealthy
+MAX_RATE_LIMITED = 0.3
+DEFAULT_LATENCY = 5.0      # assumed p90 (seconds) before any samples exist
+DEFAULT_TOKENS = 2500      # assumed tokens per call before any samples exist
+PROBE_EVERY = 20           # requests between probes of an unhealthy provider
+RECOVER_AFTER = 3          # consecutive successes that clear an unhealthy provider's failures
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+# -----------------------------
+# Rolling per-provider stats
+# -----------------------------
+class ProviderStats:
+    """
+    The last ``window`` calls to one provider. Failures from an outage are
+    forgotten once the provider, while unhealthy, answers ``RECOVER_AFTER``
+    calls in a row; otherwise they would take most of a window to age out.
+    """
+
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self.last_selected = 0   # router request number when last chosen
+        self.streak = 0          # consecutive successful calls
+
+    def record(self, seconds, failed=False, rate_limited=False, tokens=0):
+        self.samples.append((seconds, failed, rate_limited, tokens))
+
+        self.streak = 0 if failed else self.streak + 1
+        if self.streak >= RECOVER_AFTER and not self.healthy():
+            self.samples = deque((s for s in self.samples if not s[1]), maxlen=self.samples.maxlen)
+
+    def latency(self, pct):
+        return percentile([s[0] for s in self.samples if not s[1]], pct)
+
+    def error_rate(self):
+        return sum(1 for s in self.samples if s[1]) / len(self.samples) if self.samples else 0.0
+
+    def rate_limited_rate(self):
+        return sum(1 for s in self.samples if s[2]) / len(self.samples) if self.samples else 0.0
+
+    def mean_tokens(self):
+        tokens = [s[3] for s in self.samples if s[3]]
+        return sum(tokens) / len(tokens) if tokens else DEFAULT_TOKENS
+
+    def healthy(self):
+        if len(self.samples) < MIN_SAMPLES:
+            return True
+        return self.error_rate() <= MAX_ERROR_RATE and self.rate_limited_rate() <= MAX_RATE_LIMITED
+
+    def snapshot(self):
+        p50, p90 = self.latency(50), self.latency(90)
+        return {
+            "samples": len(self.samples),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p90": round(p90, 3) if p90 is not None else None,
+            "error_rate": round(self.error_rate(), 3),
+            "rate_limited": round(self.rate_limited_rate(), 3),
+            "mean_tokens": round(self.mean_tokens()),
+        }
+
+
+# -----------------------------
+# Router
+# -----------------------------
+class ModelRouter:
+    """
+    Chooses which LLMs answer a request.
+
+    Policies:
+      fastest  – the single healthy provider with the best score
+      best_two – the two best healthy providers backed by different models
+                 (just one if only one is healthy)
+      all      – every provider (demo mode)
+
+    Score = p90 latency (s) + ROUTING_COST_WEIGHT × estimated cost (cents),
+    inflated by the error rate. Providers with too few samples are tried
+    first so the stats stay current, and providers calling the same
+    upstream model are never picked together except under "all".
+    """
+
+    def __init__(self, model_ids, policy=ROUTING_POLICY, prices=PROVIDER_PRICES,
+                 cost_weight=ROUTING_COST_WEIGHT, window=200):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy {policy!r}; expected one of {POLICIES}")
+
+        self.model_ids = dict(model_ids)
+        self.policy = policy
+        self.prices = prices
+        self.cost_weight = cost_weight
+        self.stats = {name: ProviderStats(window) for name in self.model_ids}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, failed=False, rate_limited=False, tokens=0):
+        with self._lock:
+            self.stats[name].record(seconds, failed, rate_limited, tokens)
+
+    def cost_cents(self, name):
+        """Estimated cost of one call, from mean tokens and the per-million price."""
+        return self.stats[name].mean_tokens() * self.prices.get(name, 0.0) / 1e6 * 100
+
+    def score(self, name):
+        stats = self.stats[name]
+        p90 = stats.latency(90)
+        latency = p90 if p90 is not None else DEFAULT_LATENCY
+        return (latency + self.cost_weight * self.cost_cents(name)) * (1 + 2 * stats.error_rate())
+
+    def select(self, policy=None):
+        """Returns (provider names, decision dict for the response)."""
+        policy = policy or self.policy
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy {policy!r}; expected one of {POLICIES}")
+
+        with self._lock:
+            self.requests += 1
+            if policy == "all":
+                chosen = list(self.model_ids)
+            else:
+                want = 1 if policy == "fastest" else 2
+                chosen = self._pick(want)
+
+            for name in chosen:
+                self.stats[name].last_selected = self.requests
+
+            decision = {
+                "policy": policy,
+                "selected": chosen,
+                "scores": {name: round(self.score(name), 3) for name in self.model_ids},
+                "stats": {name: self.stats[name].snapshot() for name in self.model_ids},
+            }
+        return chosen, decision
+
+    def _pick(self, want):
+        # Explore under-sampled providers (and periodically re-probe unhealthy
+        # ones, whose stats would otherwise never recover) first, then rank
+        # healthy ones by score; the rest are a last resort.
+        def needs_probe(name):
+            stats = self.stats[name]
+            if len(stats.samples) < MIN_SAMPLES:
+                return True
+            return not stats.healthy() and self.requests - stats.last_selected >= PROBE_EVERY
+
+        exploring = sorted(
+            (n for n in self.model_ids if needs_probe(n)),
+            key=lambda n: len(self.stats[n].samples)
+        )
+        healthy = sorted(
+            (n for n in self.model_ids if n not in exploring and self.stats[n].healthy()),
+            key=self.score
+        )
+        unhealthy = sorted(
+            (n for n in self.model_ids if n not in exploring and n not in healthy),
+            key=self.score
+        )
+
+        chosen, models = [], set()
+        for name in exploring[:1] + healthy + exploring[1:]:
+            if self.model_ids[name] in models:
+                continue
+            chosen.append(name)
+            models.add(self.model_ids[name])
+            if len(chosen) == want:
+                break
+
+        # Answer with fewer models rather than pad with failing ones: the
+        # request would wait out their errors or timeouts for nothing. Only
+        # when nothing healthy is left is the least bad provider tried.
+        if not chosen and unhealthy:
+            chosen.append(unhealthy[0])
+        return chosen
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in self.stats.items()}
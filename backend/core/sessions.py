@@ -0,0 +1,131 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from backend.config import (
+    SESSION_TTL_SECONDS, MAX_SESSIONS, SESSION_MAX_TURNS,
+    SESSION_MAX_CHUNKS, SESSION_MAX_ANSWER_CHARS,
+)
+
+
+class Session:
+    """
+    Conversation state for one client: the last few turns (question plus
+    each model's answer) and the chunk IDs that currently make up its
+    context, kept as one block per turn that added chunks, oldest first.
+    """
+
+    def __init__(self, session_id, max_turns=SESSION_MAX_TURNS):
+        self.session_id = session_id
+        self.turns = deque(maxlen=max_turns)
+        self.context = []
+        self.touched = time.monotonic()
+        # Answer generation for one session is serialized so concurrent
+        # requests from the same client don't interleave turns.
+        self.lock = threading.Lock()
+
+    @property
+    def chunk_ids(self):
+        """Context chunk IDs in prompt order."""
+        return [cid for block in self.context for cid in block]
+
+    def retrieval_query(self, question):
+        """
+        Follow-ups like "How do I apply for it?" retrieve poorly on their
+        own, so they are searched together with the previous question.
+        """
+        if not self.turns:
+            return question
+        return f"{self.turns[-1]['question']} {question}"
+
+    def history(self, model):
+        """
+        (question, answer) pairs for one model, oldest first. Turns the model
+        didn't answer (routing picked others) use another model's answer.
+        """
+        history = []
+        for turn in self.turns:
+            answers = turn["answers"]
+            answer = answers.get(model) or next(iter(answers.values()), None)
+            if answer:
+                history.append((turn["question"], answer))
+        return history
+
+    def add_turn(self, question, answers):
+        self.turns.append({
+            "question": question,
+            "answers": {
+                name: text[:SESSION_MAX_ANSWER_CHARS]
+                for name, text in answers.items()
+            },
+        })
+
+
+class SessionStore:
+    """
+    Bounded in-memory sessions: entries expire after ``ttl`` seconds of
+    inactivity and the least recently used are dropped beyond ``max_sessions``.
+    Sessions are per worker process; a request landing on another worker
+    simply starts a fresh conversation.
+    """
+
+    def __init__(self, ttl=SESSION_TTL_SECONDS, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, session_id=None):
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_expired(now)
+
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = Session(uuid.uuid4().hex)
+                self._sessions[session.session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+
+            session.touched = now
+            return session
+
+    def _evict_expired(self, now):
+        # Ordered by last use, so expired sessions are all at the front.
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.touched < self.ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def extend_context(blocks, retrieved_ids, max_chunks=SESSION_MAX_CHUNKS):
+    """
+    Context blocks for a follow-up question.
+
+    Chunks already in the conversation keep their position and newly
+    retrieved ones are appended as one block, so the prompt prefix
+    (instructions + earlier context) stays byte-identical and provider
+    prompt caches keep hitting. When the cap would be exceeded, whole
+    blocks are dropped from the front until at most half the cap remains.
+    That breaks the prefix once, but leaves room for the next few
+    follow-ups instead of breaking it again on every turn.
+    """
+    blocks = [list(block) for block in blocks]
+    present = {cid for block in blocks for cid in block}
+    new_ids = [cid for cid in retrieved_ids if cid not in present]
+    if not new_ids:
+        return blocks
+
+    blocks.append(new_ids[:max_chunks])
+    if sum(len(block) for block in blocks) > max_chunks:
+        while len(blocks) > 1 and sum(len(block) for block in blocks) > max_chunks // 2:
+            blocks.pop(0)
+    return blocks
@@ -1,33 +1,57 @@
-import os
-import google.generativeai as genai
+import threading
 from backend.config import GEMINI_API_KEY
+from backend.llms.prompting import build_messages, flatten_messages
 
-PROMPT_PATH = os.path.join(os.path.dirname(__file__), "prompts", "prompt.txt")
+MODEL_NAME = "models/gemini-flash-latest"
 
-def load_prompt():
-    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
-        return f.read()
+_configure_lock = threading.Lock()
+_configured = False
 
 
-# Configure Gemini once
-genai.configure(api_key=GEMINI_API_KEY)
+def _genai():
+    """Import and configure google.generativeai on first use."""
+    global _configured
+    import google.generativeai as genai
+
+    with _configure_lock:
+        if not _configured:
+            genai.configure(api_key=GEMINI_API_KEY)
+            _configured = True
+    return genai
 
 
 class GeminiLLM:
+    model_id = MODEL_NAME
+
     def __init__(self):
+        genai = _genai()
+
         #  CONFIRMED WORKING MODEL
         self.model = genai.GenerativeModel(
-            model_name="models/gemini-flash-latest"
+            model_name=MODEL_NAME
         )
 
-    def generate(self, question, context):
-        prompt = load_prompt().format(
-            question=question,
-            context=context
-        )
+    def generate(self, question, context, history=None, usage=None, status=None):
+        """Same contract as the OpenRouter adapters (``usage`` / ``status`` out-params)."""
+        status = {} if status is None else status
+        # Flattened in the same prefix-first order as the chat providers so
+        # Gemini's implicit caching can match the instructions + context.
+        prompt = flatten_messages(build_messages(question, context, history))
 
         try:
             response = self.model.generate_content(prompt)
+
+            meta = getattr(response, "usage_metadata", None)
+            if usage is not None and meta is not None:
+                usage.update({
+                    "prompt_tokens": getattr(meta, "prompt_token_count", 0),
+                    "completion_tokens": getattr(meta, "candidates_token_count", 0),
+                    "cached_tokens": getattr(meta, "cached_content_token_count", 0),
+                })
+
             return response.text.strip()
         except Exception as e:
+            status["failed"] = True
+            # google.api_core reports quota errors as ResourceExhausted (429)
+            status["rate_limited"] = getattr(e, "code", None) == 429
             return f"Gemini error: {e}"
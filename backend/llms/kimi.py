@@ -1,20 +1,16 @@
-import os
 import time
 import requests
 from backend.config import OPENROUTER_API_KEY2
+from backend.llms.prompting import build_messages, parse_usage
 
 # -------- CONFIG --------
 KIMI_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 MODEL_NAME = "deepseek/deepseek-chat"
-PROMPT_PATH = os.path.join(os.path.dirname(__file__), "prompts", "prompt.txt")
-
-# -------- Load Prompt --------
-def load_prompt():
-    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
-        return f.read()
 
 
 class KimiLLM:
+    model_id = MODEL_NAME
+
     def __init__(self):
         if not OPENROUTER_API_KEY2:
             raise EnvironmentError("OPENROUTER_API_KEY2 not found")
@@ -26,18 +22,17 @@ class KimiLLM:
             "X-Title": "VoiceIQ"
         }
 
-    def generate(self, question, context):
-        prompt = load_prompt().format(
-            question=question,
-            context=context
-        )
-
+    def generate(self, question, context, history=None, usage=None, status=None):
+        """
+        ``history``: prior (question, answer) turns. If ``usage`` is a dict
+        it is filled with the provider's token counts for this call; if
+        ``status`` is a dict, ``failed`` / ``rate_limited`` are set in it
+        when the text returned is an error message instead of an answer.
+        """
+        status = {} if status is None else status
         payload = {
             "model": MODEL_NAME,
-            "messages": [
-                {"role": "system", "content": "Answer strictly from the given context."},
-                {"role": "user", "content": prompt}
-            ],
+            "messages": build_messages(question, context, history),
             "temperature": 0.2,
             "max_tokens": 300
         }
@@ -57,6 +52,9 @@ class KimiLLM:
 
                 response.raise_for_status()
                 data = response.json()
+
+                if usage is not None:
+                    usage.update(parse_usage(data.get("usage")))
                 
                 # Safely extract content
                 if "choices" in data and len(data["choices"]) > 0:
@@ -64,8 +62,13 @@ class KimiLLM:
                     if "message" in choice and "content" in choice["message"]:
                         return choice["message"]["content"].strip()
                 
+                status["failed"] = True
                 return f"Kimi error: Invalid response format"
 
             except Exception as e:
                 if attempt == 2:
+                    status["failed"] = True
                     return f"Kimi error: {e}"
+
+        status.update(failed=True, rate_limited=True)
+        return f"Kimi error: rate limited (429)"
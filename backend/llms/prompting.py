@@ -0,0 +1,59 @@
+import os
+from functools import lru_cache
+
+PROMPT_PATH = os.path.join(os.path.dirname(__file__), "prompts", "prompt.txt")
+
+
+@lru_cache(maxsize=1)
+def load_prompt():
+    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+# -----------------------------
+# Message layout
+# -----------------------------
+# Instructions and retrieved context go first and the question goes last, so
+# every turn of a conversation (and every question that retrieves the same
+# context) shares a byte-identical prefix that provider-side prompt caching
+# can reuse. Anything that varies per request must stay after that prefix.
+
+def build_messages(question, context, history=None):
+    """
+    Chat messages for one question:
+    system (instructions + context) → prior turns → current question.
+    ``history`` is a list of (question, answer) pairs, oldest first.
+    """
+    messages = [{"role": "system", "content": load_prompt().format(context=context)}]
+
+    for past_question, past_answer in history or []:
+        messages.append({"role": "user", "content": past_question})
+        messages.append({"role": "assistant", "content": past_answer})
+
+    messages.append({"role": "user", "content": question})
+    return messages
+
+
+def flatten_messages(messages):
+    """Single-string form of ``build_messages`` for text-only APIs, same prefix order."""
+    parts = [messages[0]["content"]]
+    for message in messages[1:]:
+        speaker = "User" if message["role"] == "user" else "Assistant"
+        parts.append(f"{speaker}: {message['content']}")
+    return "\n\n".join(parts)
+
+
+# -----------------------------
+# Token accounting
+# -----------------------------
+def parse_usage(raw):
+    """Normalize an OpenAI-style ``usage`` block (as returned by OpenRouter)."""
+    raw = raw or {}
+    details = raw.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens": raw.get("prompt_tokens", 0),
+        "completion_tokens": raw.get("completion_tokens", 0),
+        # OpenRouter reports cache hits in the details; DeepSeek's own API
+        # uses prompt_cache_hit_tokens.
+        "cached_tokens": details.get("cached_tokens") or raw.get("prompt_cache_hit_tokens", 0),
+    }
@@ -0,0 +1,323 @@
+import io
+import os
+import shutil
+import subprocess
+import wave
+import numpy as np
+
+from backend.config import MAX_AUDIO_SECONDS, AUDIO_ENCODE_OPUS
+
+# -----------------------------
+# Config
+# -----------------------------
+TARGET_RATE = 16000          # Deepgram's native rate; anything above is wasted bytes
+FRAME_MS = 30                # VAD frame size
+PAD_MS = 200                 # speech kept on either side of the detected region
+NOISE_MARGIN_DB = 10.0       # speech must be this far above the estimated noise floor
+DIGITAL_SILENCE_DBFS = -90.0 # a recording whose loudest frame is below this is empty
+FFMPEG_SILENCE_DB = -60.0    # silenceremove threshold; low enough to keep quiet speech
+
+FFMPEG = shutil.which("ffmpeg")
+
+
+class AudioRejected(ValueError):
+    """Upload is not usable audio (unknown format, empty, digital silence)."""
+
+
+class AudioTooLong(AudioRejected):
+    """Recording exceeds MAX_AUDIO_SECONDS."""
+
+
+# -----------------------------
+# Format detection
+# -----------------------------
+def detect_format(head):
+    """
+    Sniff the container from the first bytes of an upload.
+    Returns (format, content_type); browsers frequently mislabel uploads,
+    so this is trusted over the multipart content type.
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav", "audio/wav"
+    if head[:4] == b"OggS":
+        return "ogg", "audio/ogg"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm", "audio/webm"
+    if head[:4] == b"fLaC":
+        return "flac", "audio/flac"
+    if head[4:8] == b"ftyp":
+        return "mp4", "audio/mp4"
+    if len(head) > 1 and head[0] == 0xFF and head[1] & 0xF6 == 0xF0:
+        # ADTS AAC: 12-bit sync with layer bits 00 (MPEG audio never uses 00)
+        return "aac", "audio/aac"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF
+                              and head[1] & 0xE0 == 0xE0 and head[1] & 0x06):
+        return "mp3", "audio/mpeg"
+    return None, None
+
+
+def wav_duration(head):
+    """
+    Duration in seconds from a WAV header, or None if it can't be read from
+    the given prefix. Used to reject long recordings before reading the body.
+    """
+    try:
+        with wave.open(io.BytesIO(head)) as w:
+            nframes, rate = w.getnframes(), w.getframerate()
+            size = nframes * w.getsampwidth() * w.getnchannels()
+    except Exception:
+        return None
+
+    # Streaming recorders write a placeholder size (0 or 0xFFFFFFFF).
+    if nframes == 0 or size >= 0x7FFFFFFF:
+        return None
+    return nframes / float(rate)
+
+
+# -----------------------------
+# PCM helpers
+# -----------------------------
+def _decode_wav(audio_bytes):
+    with wave.open(io.BytesIO(audio_bytes)) as w:
+        channels = w.getnchannels()
+        width = w.getsampwidth()
+        rate = w.getframerate()
+        frames = w.readframes(w.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        # e.g. 24-bit PCM; the caller falls back to ffmpeg / pass-through
+        raise wave.Error(f"unsupported sample width: {width * 8} bits")
+
+    if channels > 1:
+        samples = samples[: len(samples) - len(samples) % channels]
+        samples = samples.reshape(-1, channels).mean(axis=1)
+
+    return samples, rate
+
+
+def _resample(samples, rate, target=TARGET_RATE):
+    if rate == target or len(samples) == 0:
+        return samples
+
+    if rate > target and rate % target == 0:
+        # Integer decimation (48k/32k → 16k): averaging each block doubles as
+        # a crude low-pass, which is plenty for speech recognition.
+        step = rate // target
+        samples = samples[: len(samples) - len(samples) % step]
+        return samples.reshape(-1, step).mean(axis=1)
+
+    duration = len(samples) / float(rate)
+    n_out = int(round(duration * target))
+    x_old = np.linspace(0.0, duration, num=len(samples), endpoint=False)
+    x_new = np.linspace(0.0, duration, num=n_out, endpoint=False)
+    return np.interp(x_new, x_old, samples).astype(np.float32)
+
+
+def trim_silence(samples, rate=TARGET_RATE):
+    """
+    Energy-based VAD: drop leading/trailing frames that sit near the noise
+    floor, keeping PAD_MS of context around the speech.
+
+    Trimming is best-effort: if there is no clear gap between the noise
+    floor and the loudest frames (continuous speech, a steady tone) the
+    samples are returned untouched. Only digital silence comes back empty.
+    """
+    frame = int(rate * FRAME_MS / 1000)
+    if len(samples) < frame:
+        return samples
+
+    n_frames = len(samples) // frame
+    frames = samples[: n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+    dbfs = 20 * np.log10(rms)
+
+    peak = dbfs.max()
+    if peak < DIGITAL_SILENCE_DBFS:
+        return samples[:0]
+
+    noise_floor = np.percentile(dbfs, 10)
+    if peak - noise_floor < NOISE_MARGIN_DB:
+        return samples
+
+    voiced = np.nonzero(dbfs > noise_floor + NOISE_MARGIN_DB)[0]
+    if len(voiced) == 0:
+        return samples
+
+    pad = int(PAD_MS / FRAME_MS)
+    first = max(0, voiced[0] - pad)
+    last = min(n_frames, voiced[-1] + pad + 1)
+    return samples[first * frame: last * frame]
+
+
+def _encode_wav(samples, rate=TARGET_RATE):
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+    return buf.getvalue()
+
+
+# -----------------------------
+# ffmpeg (optional)
+# -----------------------------
+def _ffmpeg(audio_bytes, opus, trim=True):
+    """
+    Decode any container ffmpeg understands to 16 kHz mono, trimming silence
+    and capping duration, then emit Ogg/Opus (or 16-bit WAV).
+    """
+    filters = []
+    if trim:
+        # Strip leading silence, then reverse/strip/reverse for the tail.
+        stop = f"start_periods=1:start_threshold={FFMPEG_SILENCE_DB}dB:start_silence={PAD_MS / 1000}"
+        filters = [f"silenceremove={stop}", "areverse", f"silenceremove={stop}", "areverse"]
+
+    cmd = [FFMPEG, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+           "-t", str(MAX_AUDIO_SECONDS), "-ac", "1", "-ar", str(TARGET_RATE)]
+    if filters:
+        cmd += ["-af", ",".join(filters)]
+    if opus:
+        cmd += ["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg", "pipe:1"]
+    else:
+        cmd += ["-c:a", "pcm_s16le", "-f", "wav", "pipe:1"]
+
+    proc = subprocess.run(cmd, input=audio_bytes, capture_output=True, timeout=30)
+    if proc.returncode != 0 or not proc.stdout:
+        raise RuntimeError(f"ffmpeg failed: {proc.stderr.decode(errors='ignore').strip()}")
+    return proc.stdout, ("audio/ogg" if opus else "audio/wav")
+
+
+def _ffmpeg_or_passthrough(audio_bytes, opus, content_type):
+    """
+    ffmpeg when available; otherwise (or on failure) the original bytes.
+    Passed-through audio is not duration-capped: only ffmpeg can decode it.
+    """
+    if FFMPEG:
+        try:
+            return _ffmpeg(audio_bytes, opus=opus)
+        except Exception as e:
+            print(f"⚠️ ffmpeg preprocessing failed, sending original: {e}")
+    return audio_bytes, content_type
+
+
+# -----------------------------
+# Public entry point
+# -----------------------------
+def preprocess_audio(audio_bytes, opus=None):
+    """
+    Prepare an upload for STT.
+
+    Returns (audio_bytes, content_type, info). PCM WAV is handled in-process
+    (downmix, resample to 16 kHz, trim silence); compressed formats and WAV
+    variants the ``wave`` module can't read go through ffmpeg when it is
+    installed and are otherwise passed through untouched with their
+    detected content type. Raises AudioTooLong / AudioRejected.
+    """
+    if not audio_bytes:
+        raise AudioRejected("Empty audio upload")
+
+    opus = AUDIO_ENCODE_OPUS if opus is None else opus
+    fmt, content_type = detect_format(audio_bytes[:16])
+    if fmt is None:
+        raise AudioRejected("Unrecognized audio format")
+
+    info = {"format": fmt, "bytes_in": len(audio_bytes)}
+
+    samples = None
+    if fmt == "wav":
+        duration = wav_duration(audio_bytes[:64])
+        if duration is not None and duration > MAX_AUDIO_SECONDS:
+            raise AudioTooLong(f"Recording too long ({duration:.0f}s > {MAX_AUDIO_SECONDS}s)")
+
+        try:
+            samples, rate = _decode_wav(audio_bytes)
+        except (wave.Error, EOFError) as e:
+            # Float, extensible or 24-bit WAV: let ffmpeg (or Deepgram) handle it
+            print(f"⚠️ WAV decode failed, not preprocessing in-process: {e}")
+
+    if samples is not None:
+        if len(samples) / float(rate) > MAX_AUDIO_SECONDS:
+            raise AudioTooLong(f"Recording too long (> {MAX_AUDIO_SECONDS}s)")
+
+        samples = trim_silence(_resample(samples, rate))
+        if len(samples) == 0:
+            raise AudioRejected("Recording is silent")
+
+        info["seconds"] = round(len(samples) / float(TARGET_RATE), 2)
+        out, content_type = _encode_wav(samples), "audio/wav"
+
+        if opus and FFMPEG:
+            try:
+                out, content_type = _ffmpeg(out, opus=True, trim=False)
+            except Exception as e:
+                print(f"⚠️ Opus encode failed, sending WAV: {e}")
+
+    else:
+        out, content_type = _ffmpeg_or_passthrough(audio_bytes, opus, content_type)
+
+    info["bytes_out"] = len(out)
+    info["content_type"] = content_type
+    return out, content_type, info
+
+
+# -----------------------------
+# Benchmark over sample recordings
+# -----------------------------
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Measure audio preprocessing on a folder of recordings")
+    parser.add_argument("folder")
+    parser.add_argument("--stt", action="store_true", help="also time Deepgram round-trips (raw vs processed)")
+    parser.add_argument("--no-opus", action="store_true")
+    args = parser.parse_args()
+
+    if args.stt:
+        from backend.voice.stt import speech_to_text
+
+    total_in = total_out = 0
+    stt_raw = stt_pre = 0.0
+
+    for name in sorted(os.listdir(args.folder)):
+        path = os.path.join(args.folder, name)
+        with open(path, "rb") as f:
+            raw = f.read()
+
+        started = time.perf_counter()
+        try:
+            out, ctype, info = preprocess_audio(raw, opus=not args.no_opus)
+        except AudioRejected as e:
+            print(f"{name}: rejected ({e})")
+            continue
+        prep_ms = (time.perf_counter() - started) * 1000
+
+        total_in += len(raw)
+        total_out += len(out)
+        line = f"{name}: {len(raw):>9} → {len(out):>8} bytes ({ctype}, {prep_ms:.0f} ms)"
+
+        if args.stt:
+            raw_type = detect_format(raw[:16])[1]
+            t0 = time.perf_counter()
+            speech_to_text(raw, content_type=raw_type)
+            t1 = time.perf_counter()
+            speech_to_text(out, content_type=ctype)
+            t2 = time.perf_counter()
+            stt_raw += t1 - t0
+            stt_pre += t2 - t1
+            line += f" | STT raw {t1 - t0:.2f}s, processed {t2 - t1:.2f}s"
+
+        print(line)
+
+    if total_in:
+        print(f"\nTotal: {total_in} → {total_out} bytes ({100 * total_out / total_in:.1f}%)")
+    if args.stt:
+        print(f"STT total: raw {stt_raw:.2f}s, processed {stt_pre:.2f}s")
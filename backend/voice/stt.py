@@ -8,11 +8,13 @@ load_dotenv(env_path)
 
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 
-if not DEEPGRAM_API_KEY:
-    raise EnvironmentError("❌ DEEPGRAM_API_KEY not found in .env file")
-
 
 def speech_to_text(audio_bytes, content_type: str = "audio/wav"):
+    # Checked per call rather than at import so the API can boot (and serve
+    # health/readiness checks) without STT credentials configured.
+    if not DEEPGRAM_API_KEY:
+        raise EnvironmentError("❌ DEEPGRAM_API_KEY not found in .env file")
+
     url = "https://api.deepgram.com/v1/listen"
 
     headers = {
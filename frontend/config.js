@@ -14,7 +14,8 @@ const API_CONFIG = {
     },
     TIMEOUT: 60000, // 60 seconds timeout for voice processing
     RETRY_ATTEMPTS: 3,
-    RETRY_DELAY: 1000 // 1 second between retries
+    RETRY_DELAY: 1000, // 1 second between retries
+    ROUTING_POLICY: 'all' // the demo shows a card per model; 'best_two'/'fastest' answer with fewer
 };
 
 // ============================================
@@ -63,6 +64,12 @@ async function fetchWithTimeout(url, options = {}, timeout = API_CONFIG.TIMEOUT)
                 // Response is not JSON
             }
 
+            // 429/503 from the server's load shedding say when to come back
+            const retryAfter = response.headers.get('Retry-After');
+            if (retryAfter) {
+                details = `${details || 'Server busy'} (try again in ${retryAfter}s)`;
+            }
+
             throw new APIError(errorMessage, response.status, details);
         }
 
@@ -107,8 +114,10 @@ async function fetchWithRetry(url, options = {}, retries = API_CONFIG.RETRY_ATTE
             lastError = error;
             console.warn(`Attempt ${attempt}/${retries} failed:`, error.message);
 
-            // Don't retry on client errors (4xx) or API errors
-            if (error.status >= 400 && error.status < 500) {
+            // Don't retry on client errors (4xx) or API errors, nor on 503:
+            // the server is shedding load, and re-uploading straight away
+            // would only spend rate-limit tokens and come back as a 429
+            if ((error.status >= 400 && error.status < 500) || error.status === 503) {
                 throw error;
             }
 
@@ -135,6 +144,16 @@ async function sendVoiceToAPI(audioBlob) {
     const formData = new FormData();
     formData.append('file', audioBlob, 'audio.wav');
 
+    if (API_CONFIG.ROUTING_POLICY) {
+        formData.append('policy', API_CONFIG.ROUTING_POLICY);
+    }
+
+    // Follow-up questions continue the same conversation on the backend
+    const sessionId = sessionStorage.getItem('voiceiq:sessionId');
+    if (sessionId) {
+        formData.append('session_id', sessionId);
+    }
+
     const url = `${API_CONFIG.BASE_URL}${API_CONFIG.ENDPOINTS.ASK_VOICE}`;
 
     try {
@@ -144,6 +163,9 @@ async function sendVoiceToAPI(audioBlob) {
         });
 
         const data = await response.json();
+        if (data && data.session_id) {
+            sessionStorage.setItem('voiceiq:sessionId', data.session_id);
+        }
         return data;
     } catch (error) {
         if (error instanceof APIError) {